@@ -1,7 +1,7 @@
 import os
 import dropbox
 from datetime import datetime, timedelta
-import pytz
+from zoneinfo import ZoneInfo
 import redis
 from dotenv import load_dotenv
 from pathlib import Path
@@ -60,7 +60,7 @@ def find_daily_action_folder(vault_path):
 def create_daily_action_file(daily_action_folder_path):
     """Create a new daily action file with structured prompts and two reflection questions."""
     # Define timezone for Central Time
-    central_tz = pytz.timezone('US/Central')
+    central_tz = ZoneInfo('America/Chicago')
     now_central = datetime.now(central_tz)
     next_day = now_central + timedelta(days=1)
     
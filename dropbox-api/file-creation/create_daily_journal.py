@@ -1,7 +1,7 @@
 import os
 import dropbox
 from datetime import datetime, timedelta
-import pytz
+from zoneinfo import ZoneInfo
 import redis
 from dotenv import load_dotenv
 from pathlib import Path
@@ -67,7 +67,7 @@ def get_template_content(templates_folder):
 
 def create_journal_file(journal_folder_path, vault_path):
     # Define timezone for Central Time
-    central_tz = pytz.timezone('US/Central')
+    central_tz = ZoneInfo('America/Chicago')
     now_central = datetime.now(central_tz)
     next_day = now_central + timedelta(days=1)
     
@@ -1,7 +1,7 @@
 import os
 import dropbox
 from datetime import datetime, timedelta
-import pytz
+from zoneinfo import ZoneInfo
 import redis
 from dotenv import load_dotenv
 from pathlib import Path
@@ -105,7 +105,7 @@ def main():
         template_content = get_template_content(templates_folder_path)
 
         # Calculate the title date for the file (Sunday after the upcoming Sunday)
-        central_tz = pytz.timezone('US/Central')
+        central_tz = ZoneInfo('America/Chicago')
         today = datetime.now(central_tz)
         days_until_sunday = (6 - today.weekday()) % 7
         next_sunday = today + timedelta(days=days_until_sunday)
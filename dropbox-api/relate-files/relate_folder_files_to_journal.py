@@ -3,7 +3,7 @@ import dropbox
 import redis
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import pytz
+from zoneinfo import ZoneInfo
 
 # Load environment variables from .env file
 load_dotenv()
@@ -103,12 +103,12 @@ def fetch_sorted_files_metadata(folder_path):
 def filter_recent_files(files_metadata, lookback_days):
     """Filter files that were created or modified in the last 'lookback_days' days using Eastern Time."""
     recent_files = []
-    lookback_date = datetime.now(pytz.timezone('US/Eastern')) - timedelta(days=lookback_days)
+    lookback_date = datetime.now(ZoneInfo('America/New_York')) - timedelta(days=lookback_days)
 
     for entry in files_metadata:
         if isinstance(entry, dropbox.files.FileMetadata):
             # Use client_modified for created date
-            created_time = entry.client_modified.astimezone(pytz.timezone('US/Eastern'))
+            created_time = entry.client_modified.astimezone(ZoneInfo('America/New_York'))
 
             if created_time >= lookback_date:
                 recent_files.append({
@@ -3,7 +3,6 @@ import dropbox
 import redis
 from datetime import datetime
 from dotenv import load_dotenv
-import pytz
 
 # Load environment variables
 load_dotenv()
@@ -3,7 +3,7 @@ import dropbox
 import redis
 from datetime import datetime
 from dotenv import load_dotenv
-import pytz
+from zoneinfo import ZoneInfo
 
 # Load environment variables
 load_dotenv()
@@ -61,7 +61,7 @@ def find_journal_folder(daily_folder_path):
 def find_today_journal_entry(journal_folder):
     try:
         # Format today's date as 'Month DD, YYYY.md'
-        today = datetime.now(pytz.timezone('US/Eastern')).strftime('%b %d, %Y.md').lower()
+        today = datetime.now(ZoneInfo('America/New_York')).strftime('%b %d, %Y.md').lower()
         all_files = []
         response = dbx.files_list_folder(journal_folder)
 
@@ -3,7 +3,6 @@ import dropbox
 import redis
 from dotenv import load_dotenv
 from datetime import datetime
-import pytz
 import logging
 import re
 
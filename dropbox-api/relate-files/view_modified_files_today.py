@@ -3,7 +3,7 @@ import dropbox
 import redis
 from dotenv import load_dotenv
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
 
 # Load environment variables
 load_dotenv()
@@ -40,7 +40,7 @@ def load_paths(file_path):
 # Function to check if files in a folder were client modified today
 def get_modified_files_today(paths):
     modified_files = []
-    today = datetime.now(pytz.timezone('US/Eastern')).date()
+    today = datetime.now(ZoneInfo('America/New_York')).date()
 
     for path in paths:
         try:
@@ -2,7 +2,6 @@ import os
 import dropbox
 import re
 from datetime import datetime, timedelta
-import pytz
 import redis
 from dotenv import load_dotenv
 from pathlib import Path
@@ -8,7 +8,7 @@ from openai import OpenAI
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from pytz import timezone
+from zoneinfo import ZoneInfo
 from datetime import timedelta
 
 # Load environment variables from .env file
@@ -69,11 +69,10 @@ def fetch_today_journal_entry(journal_folder_path):
     """
     Fetch today's journal entry from the '_Journal' folder, assuming lowercase file names.
     """
-    # Set up timezones
-    eastern = timezone('US/Eastern')
-    utc = timezone('UTC')
+    # Set up timezone
+    eastern = ZoneInfo('America/New_York')
 
-    # Current time in Eastern Time and UTC
+    # Current time in Eastern Time
     now_eastern = datetime.now(eastern)
     today_date = now_eastern.strftime("%b %-d, %Y").lower()  # e.g., "nov 15, 2024"
 
@@ -7,7 +7,7 @@ from openai import OpenAI
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from pytz import timezone
+from zoneinfo import ZoneInfo
 
 # Load environment variables from .env file
 load_dotenv()
@@ -71,7 +71,7 @@ def find_journal_folder(daily_folder_path):
 
 def fetch_yesterday_journal_entry(journal_folder_path):
     """Fetch yesterday's journal entry from the '_Journal' folder."""
-    eastern = timezone('US/Eastern')
+    eastern = ZoneInfo('America/New_York')
     now_eastern = datetime.now(eastern)
 
     # Calculate the previous day
@@ -2,7 +2,7 @@ import os
 import sys
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import pytz
+from zoneinfo import ZoneInfo
 
 # Get the directory of the script
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -27,7 +27,7 @@ def fetch_last_journal_date(journal_path):
 
 def create_journal_file(file_path):
     # Define timezone for Central Time
-    central_tz = pytz.timezone('US/Central')
+    central_tz = ZoneInfo('America/Chicago')
 
     # Get the current time in Central Time
     now_central = datetime.now(central_tz)
@@ -1,13 +1,16 @@
 import os
 import requests
 import re
+import string
 from dotenv import load_dotenv
 from pathlib import Path
 from notion_client import Client
+from notion_client.helpers import iterate_paginated_api
 from datetime import datetime, timezone, timedelta
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 import logging
+from functools import lru_cache
 
 # Define the path to the .env file relative to the script's location
 env_path = Path(__file__).resolve().parent.parent.parent / '.env'
@@ -45,11 +48,44 @@ for var in required_env_vars:
 # Initialize Notion client
 notion = Client(auth=NOTION_API_KEY)
 
+# Headers for direct Notion REST calls
+headers = {
+    "Authorization": f"Bearer {NOTION_API_KEY}",
+    "Notion-Version": "2022-06-28",
+    "Content-Type": "application/json"
+}
+
+# Pooled HTTP session reused by every block fetch
+session = requests.Session()
+session.headers.update(headers)
+
 # Ensure the output path exists
 output_path = Path(OBSIDIAN_KNOWLEDGE_HUB_PATH) if OBSIDIAN_KNOWLEDGE_HUB_PATH else Path('output')
 output_path.mkdir(parents=True, exist_ok=True)
 
+# Characters that are not allowed in file names
+INVALID_FILENAME_CHARS = re.compile(r'[\/:*?"<>|]')
+
+# Frontmatter template for generated Obsidian notes
+_FRONTMATTER = string.Template("""---
+Journal: 
+  - "[[${date}]]"
+created time: ${run_ts}
+modified time: ${run_ts}
+key words: 
+People: 
+URL: ${url}
+Notes+Ideas: 
+Experiences: 
+Tags: 
+---
+
+## ${title}
+
+""")
+
 # Google Sheets functions
+@lru_cache(maxsize=1)
 def get_sheets_service():
     creds = Credentials.from_service_account_file(GDRIVE_CREDENTIALS_PATH, scopes=SCOPES)
     return build('sheets', 'v4', credentials=creds)
@@ -86,10 +122,10 @@ def update_run_timestamp():
     logger.info(f"Timestamp updated: {now}")
 
 # Notion parsing functions
-def fetch_and_parse_blocks(block_id, headers):
+def fetch_and_parse_blocks(block_id):
     try:
         blocks_url = f"https://api.notion.com/v1/blocks/{block_id}/children"
-        response = requests.get(blocks_url, headers=headers)
+        response = session.get(blocks_url)
         response.raise_for_status()
         data_blocks = response.json()
 
@@ -121,13 +157,18 @@ def fetch_and_parse_blocks(block_id, headers):
                 markdown_content += parse_toggle(block)
 
             if block.get("has_children"):
-                markdown_content += fetch_and_parse_blocks(block["id"], headers)
+                markdown_content += _render_subtree(block["id"])
 
         return markdown_content
     except Exception as e:
         logger.error(f"Error parsing blocks for block ID {block_id}: {e}")
         return ""
 
+@lru_cache(maxsize=4096)
+def _render_subtree(block_id):
+    """Render a block's children to Markdown, memoized so a subtree is only fetched once per page."""
+    return fetch_and_parse_blocks(block_id)
+
 def parse_paragraph(block):
     text = extract_text(block["paragraph"]["rich_text"])
     return f"{text}\n\n"
@@ -170,33 +211,42 @@ def parse_toggle(block):
     text = extract_text(block["toggle"]["rich_text"])
     toggle_content = f"* {text}\n"
     if block.get("has_children"):
-        toggle_content += fetch_and_parse_blocks(block["id"], headers)
+        toggle_content += _render_subtree(block["id"])
     return toggle_content
 
 def extract_text(rich_text_array):
-    text = ""
+    parts = []
     for rich_text in rich_text_array:
         if 'text' in rich_text:
-            plain_text = rich_text["text"]["content"]
             annotations = rich_text["annotations"]
+            # Wrappers are collected innermost-first, matching the order they are applied
+            prefixes = []
+            suffixes = []
             if annotations.get("bold"):
-                plain_text = f"**{plain_text}**"
+                prefixes.append("**")
+                suffixes.append("**")
             if annotations.get("italic"):
-                plain_text = f"*{plain_text}*"
+                prefixes.append("*")
+                suffixes.append("*")
             if annotations.get("strikethrough"):
-                plain_text = f"~~{plain_text}~~"
+                prefixes.append("~~")
+                suffixes.append("~~")
             if annotations.get("underline"):
-                plain_text = f"<u>{plain_text}</u>"
+                prefixes.append("<u>")
+                suffixes.append("</u>")
             if annotations.get("code"):
-                plain_text = f"`{plain_text}`"
+                prefixes.append("`")
+                suffixes.append("`")
             if rich_text["text"].get("link"):
-                url = rich_text["text"]["link"]["url"]
-                plain_text = f"[{plain_text}]({url})"
-            text += plain_text
-    return text
+                prefixes.append("[")
+                suffixes.append(f"]({rich_text['text']['link']['url']})")
+            parts.append("".join(reversed(prefixes)))
+            parts.append(rich_text["text"]["content"])
+            parts.append("".join(suffixes))
+    return "".join(parts)
 
 def sanitize_filename(title):
-    return re.sub(r'[\/:*?"<>|]', '_', title)
+    return INVALID_FILENAME_CHARS.sub('_', title)
 
 # Main execution
 def main():
@@ -204,12 +254,6 @@ def main():
     
     # Print Google Sheet URL at the start
     print_sheet_url()
-    
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Notion-Version": "2022-06-28",
-        "Content-Type": "application/json"
-    }
 
     last_run_timestamp = get_last_run_timestamp()
     if not last_run_timestamp:
@@ -220,76 +264,71 @@ def main():
     skipped_files_due_to_existence = []
     skipped_files_due_to_error = []
 
+    run_ts = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f%z')
+    pages_identified = 0
+    pages_processed = 0
     try:
-        pages = notion.databases.query(
-            **{
-                "database_id": NOTION_KNOWLEDGE_HUB_DB,
-                "filter": {
+        # Follow Notion's cursors so runs with more than 100 new pages are not truncated,
+        # converting each page as soon as its response page arrives
+        pages = iterate_paginated_api(
+            notion.databases.query,
+            database_id=NOTION_KNOWLEDGE_HUB_DB,
+            filter={
+                "property": "Created",
+                "date": {
+                    "after": last_run_timestamp.isoformat()
+                }
+            },
+            sorts=[
+                {
                     "property": "Created",
-                    "date": {
-                        "after": last_run_timestamp.isoformat()
-                    }
+                    "direction": "ascending"
                 },
-                "sorts": [
-                    {
-                        "property": "Created",
-                        "direction": "ascending"
-                    },
-                ],
-            }
-        )["results"]
-        logger.info(f"Total pages identified for migration: {len(pages)}")
+            ],
+        )
+        for page in pages:
+            pages_identified += 1
+            title = filename = None
+            try:
+                title = page['properties']['Name']['title'][0]['plain_text']
+                url = page['properties']['URL']['url'] if 'URL' in page['properties'] else None
+                filename = sanitize_filename(title) + '.md'
+                full_path = output_path / filename
+
+                # Skip existing notes before fetching any of their blocks
+                if full_path.exists():
+                    logger.warning(f"File '{filename}' already exists. Skipping.")
+                    skipped_files_due_to_existence.append(filename)
+                    continue
+
+                # Bound the subtree cache to a single page
+                _render_subtree.cache_clear()
+                content = fetch_and_parse_blocks(page['id'])
+
+                created_time = datetime.fromisoformat(page['created_time'].rstrip('Z'))
+                formatted_date = created_time.strftime("%b %-d, %Y")
+
+                markdown_content = _FRONTMATTER.substitute(
+                    date=formatted_date, run_ts=run_ts, url=url if url else '', title=title
+                ) + content
+
+                with open(full_path, 'w', encoding='utf-8') as md_file:
+                    md_file.write(markdown_content)
+
+                logger.info(f"Markdown file created: {full_path}")
+                pages_processed += 1
+
+            except Exception as e:
+                logger.error(f"Error processing page {page['id']} ({title}): {e}")
+                skipped_files_due_to_error.append(filename or page['id'])
+                continue
+
     except Exception as e:
+        # Per-page errors are logged and skipped above, so this catches failures fetching the next page of results
         logger.error(f"Failed to query Notion database: {e}")
         return
 
-    pages_processed = 0
-    for page in pages:
-        try:
-            title = page['properties']['Name']['title'][0]['plain_text']
-            url = page['properties']['URL']['url'] if 'URL' in page['properties'] else None
-            content = fetch_and_parse_blocks(page['id'], headers)  # Pass headers to the function
-            
-            created_time = datetime.fromisoformat(page['created_time'].rstrip('Z'))
-            formatted_date = created_time.strftime("%b %-d, %Y")
-            
-            filename = sanitize_filename(title) + '.md'
-            full_path = output_path / filename
-
-            if full_path.exists():
-                logger.warning(f"File '{filename}' already exists. Skipping.")
-                skipped_files_due_to_existence.append(filename)
-                continue
-
-            markdown_content = f"""---
-Journal: 
-  - "[[{formatted_date}]]"
-created time: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f%z')}
-modified time: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f%z')}
-key words: 
-People: 
-URL: {url if url else ''}
-Notes+Ideas: 
-Experiences: 
-Tags: 
----
-
-## {title}
-
-"""
-            markdown_content += content
-
-            with open(full_path, 'w', encoding='utf-8') as md_file:
-                md_file.write(markdown_content)
-
-            logger.info(f"Markdown file created: {full_path}")
-            pages_processed += 1
-
-        except Exception as e:
-            logger.error(f"Error processing page {page['id']} ({title}): {e}")
-            skipped_files_due_to_error.append(filename)
-            continue
-
+    logger.info(f"Total pages identified for migration: {pages_identified}")
     logger.info(f"Total pages processed: {pages_processed}")
     
     # Log files skipped due to existence
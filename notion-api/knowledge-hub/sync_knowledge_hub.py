@@ -1,9 +1,11 @@
 import os
+import asyncio
 import dropbox
+import httpx
 import redis
-import requests
 import re
-from notion_client import Client
+import string
+from functools import lru_cache, partial
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
 from pathlib import Path
@@ -24,17 +26,35 @@ redis_password = os.getenv('REDIS_PASSWORD', None)
 r = redis.StrictRedis(host=redis_host, port=redis_port, password=redis_password, decode_responses=True)
 REDIS_LAST_RUN_KEY = "notion_knowledge_hub_last_run_at"
 
+# Read every value needed at startup from Redis in a single round trip
+@lru_cache(maxsize=1)
+def load_startup_state():
+    """Return the Dropbox access token and last run timestamp stored in Redis.
+
+    Call `load_startup_state.cache_clear()` and `get_dropbox_client.cache_clear()`
+    after an authentication error to pick up a refreshed token.
+    """
+    pipe = r.pipeline(transaction=False)
+    pipe.get('DROPBOX_ACCESS_TOKEN')
+    pipe.get(REDIS_LAST_RUN_KEY)
+    access_token, last_run = pipe.execute()
+    return access_token, last_run
+
 # Retrieve Dropbox access token from Redis
 def get_dropbox_access_token():
     """Retrieve Dropbox access token from Redis."""
-    access_token = r.get('DROPBOX_ACCESS_TOKEN')
+    access_token, _ = load_startup_state()
     if not access_token:
         raise EnvironmentError("Error: Dropbox access token not found in Redis.")
     return access_token
 
 # Dropbox Client Initialization
-DROPBOX_ACCESS_TOKEN = get_dropbox_access_token()
-dbx = dropbox.Dropbox(DROPBOX_ACCESS_TOKEN)
+@lru_cache(maxsize=1)
+def get_dropbox_client():
+    """Build the shared Dropbox client on first use."""
+    # Pooled HTTPS session shared by every Dropbox call, including those run from worker threads
+    dropbox_session = dropbox.create_session(max_connections=20)
+    return dropbox.Dropbox(get_dropbox_access_token(), session=dropbox_session, timeout=60)
 
 # Notion API configuration
 NOTION_API_KEY = os.getenv('NOTION_API_KEY')
@@ -47,14 +67,51 @@ DROPBOX_OBSIDIAN_VAULT_PATH = os.getenv('DROPBOX_OBSIDIAN_VAULT_PATH')
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger()
 
-# Initialize Notion client
-notion = Client(auth=NOTION_API_KEY)
+# Connection pool and retry policy for direct Notion REST calls
+NOTION_HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+NOTION_HTTP_TIMEOUT = 30
+NOTION_MAX_RETRIES = 5
+NOTION_RETRY_BACKOFF = 0.5
+NOTION_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Caps concurrent Notion requests only; notion_request's 429 retry is what keeps us under the rate limit
+notion_semaphore = asyncio.Semaphore(3)
+
+# Frontmatter and body of each exported note
+FRONTMATTER = string.Template("""---
+Journal: 
+  - "[[${journal_date}]]"
+created time: ${run_ts}
+modified time: ${run_ts}
+key words: 
+People: 
+URL: ${url}
+Notes+Ideas: 
+Experiences: 
+Tags: 
+---
+
+## ${title}
+
+${content}
+""")
+
+# Page properties read by the sync; Notion omits every other property from query results
+SYNCED_PROPERTIES = ("Name", "URL")
+
+# Characters that are not allowed in file names
+INVALID_FILENAME_CHARS = re.compile(r'[\/:*?"<>|]')
+
+# Upload sessions started in parallel, and the most sessions one batch commit accepts
+DROPBOX_UPLOAD_CONCURRENCY = 8
+DROPBOX_BATCH_COMMIT_LIMIT = 1000
+DROPBOX_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
 
 # Function to search for the _Knowledge-Hub folder in the Dropbox Obsidian Vault
 def find_knowledge_hub_path(vault_path):
     """Search for the `_Knowledge-Hub` folder in the Dropbox Obsidian Vault path."""
     try:
-        response = dbx.files_list_folder(vault_path)
+        response = get_dropbox_client().files_list_folder(vault_path)
         for entry in response.entries:
             if isinstance(entry, dropbox.files.FolderMetadata) and entry.name.endswith("_Knowledge-Hub"):
                 logger.info(f"Found Knowledge Hub path: {entry.path_lower}")
@@ -64,10 +121,25 @@ def find_knowledge_hub_path(vault_path):
         logger.error(f"Dropbox API error while searching for _Knowledge-Hub: {e}")
         raise e
 
+# List the files already in a Dropbox folder
+def list_existing_files(folder_path):
+    """Return the lowercased names of the files in a Dropbox folder (Dropbox paths are case-insensitive)."""
+    dbx = get_dropbox_client()
+    existing_files = set()
+    response = dbx.files_list_folder(folder_path)
+    while True:
+        existing_files.update(
+            entry.name.lower() for entry in response.entries if isinstance(entry, dropbox.files.FileMetadata)
+        )
+        if not response.has_more:
+            break
+        response = dbx.files_list_folder_continue(response.cursor)
+    return existing_files
+
 # Retrieve the last run timestamp from Redis or default to 24 hours ago
 def get_last_run_timestamp():
     try:
-        last_run = r.get(REDIS_LAST_RUN_KEY)
+        _, last_run = load_startup_state()
         if last_run:
             return datetime.fromisoformat(last_run).replace(tzinfo=timezone.utc)
         else:
@@ -87,56 +159,73 @@ def update_run_timestamp():
     except Exception as e:
         logger.error(f"Error updating last run timestamp: {e}")
 
-# Parse Notion block content into Markdown
-def fetch_and_parse_blocks(block_id, headers):
-    try:
-        blocks_url = f"https://api.notion.com/v1/blocks/{block_id}/children"
-        response = requests.get(blocks_url, headers=headers)
-        response.raise_for_status()
-        data_blocks = response.json()
-
-        markdown_content = ""
-        for block in data_blocks["results"]:
-            block_type = block["type"]
-            markdown_content += parse_block(block, block_type, headers)
-
-        return markdown_content
-    except Exception as e:
-        logger.error(f"Error parsing blocks for block ID {block_id}: {e}")
-        return ""
+# Call a Notion endpoint, retrying transient failures with exponential backoff
+async def notion_request(client, method, url, **kwargs):
+    for attempt in range(NOTION_MAX_RETRIES + 1):
+        async with notion_semaphore:
+            response = await client.request(method, url, **kwargs)
+        if response.status_code not in NOTION_RETRY_STATUSES or attempt == NOTION_MAX_RETRIES:
+            break
+        # Prefer the wait Notion asks for on 429s over our own backoff
+        retry_after = response.headers.get("Retry-After")
+        await asyncio.sleep(float(retry_after) if retry_after else NOTION_RETRY_BACKOFF * (2 ** attempt))
+    response.raise_for_status()
+    return response
+
+# Fetch the direct children of a Notion block
+async def fetch_children(block_id, client):
+    response = await notion_request(client, "GET", f"https://api.notion.com/v1/blocks/{block_id}/children")
+    return response.json()["results"]
+
+# Fetch a block tree breadth-first, requesting every block on the same level concurrently
+async def fetch_block_tree(root_id, client):
+    """Return a mapping of block ID to its child blocks for every expandable block under `root_id`."""
+    children = {}
+    queue = [root_id]
+    while queue:
+        results = await asyncio.gather(
+            *[fetch_children(block_id, client) for block_id in queue],
+            return_exceptions=True
+        )
+        next_queue = []
+        for block_id, blocks in zip(queue, results):
+            if isinstance(blocks, Exception):
+                logger.error(f"Error parsing blocks for block ID {block_id}: {blocks}")
+                continue
+            children[block_id] = blocks
+            next_queue.extend(
+                block["id"] for block in blocks if block["type"] == "toggle" and block.get("has_children")
+            )
+        queue = next_queue
+    return children
 
-def parse_block(block, block_type, headers):
+# Parse Notion block content into Markdown
+async def fetch_and_parse_blocks(block_id, client):
+    children = await fetch_block_tree(block_id, client)
+    return render_blocks(block_id, children)
+
+def render_blocks(block_id, children):
+    parts = []
+    for block in children.get(block_id, []):
+        block_type = block["type"]
+        parts.append(parse_block(block, block_type, children))
+    return "".join(parts)
+
+def parse_block(block, block_type, children):
     try:
-        if block_type == "paragraph":
-            return parse_paragraph(block)
-        elif block_type.startswith("heading_"):
+        if block_type.startswith("heading_"):
             return parse_heading(block, block_type)
-        elif block_type == "bulleted_list_item":
-            return parse_list_item(block, "- ", 0)
-        elif block_type == "numbered_list_item":
-            return parse_list_item(block, "1. ", 0)
-        elif block_type == "to_do":
-            return parse_to_do(block)
-        elif block_type == "quote":
-            return parse_quote(block)
-        elif block_type == "code":
-            return parse_code(block)
-        elif block_type == "divider":
-            return "---\n"
-        elif block_type == "image":
-            return parse_image(block)
-        elif block_type == "callout":
-            return parse_callout(block)
-        elif block_type == "toggle":
-            return parse_toggle(block, headers)
-        return ""
+        if block_type == "toggle":
+            return parse_toggle(block, children)
+        parser = BLOCK_PARSERS.get(block_type)
+        return parser(block) if parser else ""
     except Exception as e:
         logger.error(f"Error parsing block type {block_type}: {e}")
         return ""
 
 # Sanitize filenames for valid OS usage
 def sanitize_filename(title):
-    return re.sub(r'[\/:*?"<>|]', '_', title)
+    return INVALID_FILENAME_CHARS.sub('_', title)
 
 def parse_paragraph(block):
     return f"{extract_text(block['paragraph']['rich_text'])}\n\n"
@@ -173,15 +262,15 @@ def parse_callout(block):
     text = extract_text(block["callout"]["rich_text"])
     return f"> {icon} {text}\n\n"
 
-def parse_toggle(block, headers):
+def parse_toggle(block, children):
     text = extract_text(block["toggle"]["rich_text"])
-    toggle_content = f"* {text}\n"
+    parts = [f"* {text}\n"]
     if block.get("has_children"):
-        toggle_content += fetch_and_parse_blocks(block["id"], headers)
-    return toggle_content
+        parts.append(render_blocks(block["id"], children))
+    return "".join(parts)
 
 def extract_text(rich_text_array):
-    text = ""
+    parts = []
     for rich_text in rich_text_array:
         plain_text = rich_text["text"]["content"]
         annotations = rich_text["annotations"]
@@ -198,11 +287,126 @@ def extract_text(rich_text_array):
         if rich_text["text"].get("link"):
             url = rich_text["text"]["link"]["url"]
             plain_text = f"[{plain_text}]({url})"
-        text += plain_text
-    return text
+        parts.append(plain_text)
+    return "".join(parts)
+
+# Block types rendered from the block alone; headings and toggles are handled in parse_block
+BLOCK_PARSERS = {
+    "paragraph": parse_paragraph,
+    "bulleted_list_item": partial(parse_list_item, prefix="- ", indent_level=0),
+    "numbered_list_item": partial(parse_list_item, prefix="1. ", indent_level=0),
+    "to_do": parse_to_do,
+    "quote": parse_quote,
+    "code": parse_code,
+    "divider": lambda block: "---\n",
+    "image": parse_image,
+    "callout": parse_callout,
+}
+
+# Convert a single Notion page to Markdown, returning the (path, data) pair to upload
+async def process_page(page, knowledge_hub_path, existing_files, run_fields, client):
+    try:
+        title = page['properties']['Name']['title'][0]['plain_text']
+        url = page['properties'].get('URL', {}).get('url', '')
+        filename = sanitize_filename(title) + '.md'
+        dropbox_file_path = f"{knowledge_hub_path}/{filename}"
+
+        # Check if file already exists in Dropbox before fetching any blocks
+        if filename.lower() in existing_files:
+            logger.warning(f"File '{filename}' already exists in Dropbox. Skipping.")
+            return None
+        # Claim the name so a concurrent page with the same title is skipped too
+        existing_files.add(filename.lower())
+
+        content = await fetch_and_parse_blocks(page['id'], client)
+
+        # Construct Markdown content
+        markdown_content = FRONTMATTER.substitute(run_fields, url=url if url else '', title=title, content=content)
+        return dropbox_file_path, markdown_content.encode('utf-8')
+    except Exception as e:
+        logger.error(f"Error processing page {page.get('id')}: {e}")
+        return None
+
+# Send content to a new upload session in fixed-size chunks, closing the session for a batch commit
+def send_upload_session(data):
+    dbx = get_dropbox_client()
+    content = memoryview(data)
+    chunk = content[:DROPBOX_UPLOAD_CHUNK_SIZE]
+    result = dbx.files_upload_session_start(bytes(chunk), close=len(chunk) == len(content))
+    offset = len(chunk)
+    while offset < len(content):
+        chunk = content[offset:offset + DROPBOX_UPLOAD_CHUNK_SIZE]
+        cursor = dropbox.files.UploadSessionCursor(session_id=result.session_id, offset=offset)
+        dbx.files_upload_session_append_v2(bytes(chunk), cursor, close=offset + len(chunk) == len(content))
+        offset += len(chunk)
+    return dropbox.files.UploadSessionCursor(session_id=result.session_id, offset=offset)
+
+# Upload a file's content in its own upload session, ready for a batch commit
+async def start_upload_session(path, data, semaphore):
+    try:
+        async with semaphore:
+            cursor = await asyncio.to_thread(send_upload_session, data)
+        return dropbox.files.UploadSessionFinishArg(
+            cursor=cursor,
+            commit=dropbox.files.CommitInfo(path=path, mode=dropbox.files.WriteMode.overwrite)
+        )
+    except Exception as e:
+        logger.error(f"Error starting upload session for {path}: {e}")
+        return None
+
+# Upload files to Dropbox, committing all upload sessions in one batch
+async def upload_files(uploads):
+    semaphore = asyncio.Semaphore(DROPBOX_UPLOAD_CONCURRENCY)
+    entries = await asyncio.gather(*[start_upload_session(path, data, semaphore) for path, data in uploads])
+    ready = [(path, entry) for (path, _), entry in zip(uploads, entries) if entry is not None]
+
+    for i in range(0, len(ready), DROPBOX_BATCH_COMMIT_LIMIT):
+        batch = ready[i:i + DROPBOX_BATCH_COMMIT_LIMIT]
+        try:
+            result = await asyncio.to_thread(
+                get_dropbox_client().files_upload_session_finish_batch_v2,
+                [entry for _, entry in batch]
+            )
+        except Exception as e:
+            logger.error(f"Error committing upload batch: {e}")
+            continue
+
+        for (path, _), outcome in zip(batch, result.entries):
+            if outcome.is_success():
+                logger.info(f"Markdown file uploaded to Dropbox: {path}")
+            else:
+                logger.error(f"Error uploading {path}: {outcome.get_failure()}")
+
+# Stream Knowledge Hub pages created after the given time, one response page at a time
+async def iterate_new_pages(client, created_after):
+    database_url = f"https://api.notion.com/v1/databases/{NOTION_KNOWLEDGE_HUB_DB}"
+    database = (await notion_request(client, "GET", database_url)).json()
+    params = [
+        ("filter_properties", database["properties"][name]["id"])
+        for name in SYNCED_PROPERTIES if name in database["properties"]
+    ]
+    body = {
+        "filter": {
+            "property": "Created",
+            "date": {
+                "after": created_after.isoformat()
+            }
+        },
+        "sorts": [{"property": "Created", "direction": "ascending"}],
+        "page_size": 100,
+    }
+
+    while True:
+        response = await notion_request(client, "POST", f"{database_url}/query", params=params, json=body)
+        data = response.json()
+        for page in data["results"]:
+            yield page
+        if not data.get("has_more"):
+            break
+        body["start_cursor"] = data["next_cursor"]
 
 # Process Notion pages
-def process_notion_pages(knowledge_hub_path):
+async def process_notion_pages(knowledge_hub_path):
     headers = {
         "Authorization": f"Bearer {NOTION_API_KEY}",
         "Notion-Version": "2022-06-28",
@@ -212,75 +416,38 @@ def process_notion_pages(knowledge_hub_path):
     last_run_timestamp = get_last_run_timestamp()
     logger.info(f"Processing pages created after: {last_run_timestamp}")
 
-    try:
-        pages = notion.databases.query(
-            **{
-                "database_id": NOTION_KNOWLEDGE_HUB_DB,
-                "filter": {
-                    "property": "Created",
-                    "date": {
-                        "after": last_run_timestamp.isoformat()
-                    }
-                },
-                "sorts": [{"property": "Created", "direction": "ascending"}],
-            }
-        )["results"]
-        logger.info(f"Total pages identified for processing: {len(pages)}")
-    except Exception as e:
-        logger.error(f"Failed to query Notion database: {e}")
-        return
+    existing_files = await asyncio.to_thread(list_existing_files, knowledge_hub_path)
+    logger.info(f"Found {len(existing_files)} existing files in Dropbox.")
+
+    # Every note written in this run shares the same journal date and timestamps
+    run_time = datetime.now(timezone.utc)
+    run_fields = {"journal_date": run_time.strftime('%b %-d, %Y'), "run_ts": run_time.isoformat()}
 
-    for page in pages:
+    # Pages are independent, so start converting each one as soon as the query returns it
+    tasks = []
+    transport = httpx.AsyncHTTPTransport(limits=NOTION_HTTP_LIMITS, retries=NOTION_MAX_RETRIES)
+    async with httpx.AsyncClient(headers=headers, transport=transport, timeout=NOTION_HTTP_TIMEOUT) as client:
         try:
-            title = page['properties']['Name']['title'][0]['plain_text']
-            url = page['properties'].get('URL', {}).get('url', '')
-            content = fetch_and_parse_blocks(page['id'], headers)
-            filename = sanitize_filename(title) + '.md'
-            dropbox_file_path = f"{knowledge_hub_path}/{filename}"
-
-            # Check if file already exists in Dropbox
-            try:
-                dbx.files_get_metadata(dropbox_file_path)
-                logger.warning(f"File '{filename}' already exists in Dropbox. Skipping.")
-                continue
-            except dropbox.exceptions.ApiError as e:
-                if e.error.is_path() and e.error.get_path().is_not_found():
-                    pass  # File does not exist; proceed to upload
-                else:
-                    raise e
-
-            # Construct Markdown content
-            markdown_content = f"""---
-Journal: 
-  - "[[{datetime.now(timezone.utc).strftime('%b %-d, %Y')}]]"
-created time: {datetime.now(timezone.utc).isoformat()}
-modified time: {datetime.now(timezone.utc).isoformat()}
-key words: 
-People: 
-URL: {url if url else ''}
-Notes+Ideas: 
-Experiences: 
-Tags: 
----
+            async for page in iterate_new_pages(client, last_run_timestamp):
+                tasks.append(asyncio.create_task(process_page(page, knowledge_hub_path, existing_files, run_fields, client)))
+        except Exception as e:
+            logger.error(f"Failed to query Notion database: {e}")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return
 
-## {title}
+        logger.info(f"Total pages identified for processing: {len(tasks)}")
+        results = await asyncio.gather(*tasks)
 
-{content}
-"""
-            # Upload file to Dropbox
-            dbx.files_upload(
-                markdown_content.encode('utf-8'),
-                dropbox_file_path,
-                mode=dropbox.files.WriteMode.overwrite
-            )
-            logger.info(f"Markdown file uploaded to Dropbox: {dropbox_file_path}")
-        except Exception as e:
-            logger.error(f"Error processing page {page.get('id')}: {e}")
+    uploads = [upload for upload in results if upload is not None]
+    if uploads:
+        await upload_files(uploads)
 
     update_run_timestamp()
 
 # Main function
-def main():
+async def main():
     if not NOTION_API_KEY or not NOTION_KNOWLEDGE_HUB_DB:
         logger.error("Error: Missing required environment variables for Notion API.")
         return
@@ -290,12 +457,13 @@ def main():
         return
 
     try:
-        knowledge_hub_path = find_knowledge_hub_path(DROPBOX_OBSIDIAN_VAULT_PATH)
-        process_notion_pages(knowledge_hub_path)
+        await asyncio.to_thread(load_startup_state)
+        knowledge_hub_path = await asyncio.to_thread(find_knowledge_hub_path, DROPBOX_OBSIDIAN_VAULT_PATH)
+        await process_notion_pages(knowledge_hub_path)
     except FileNotFoundError as e:
         logger.error(f"Error: {e}")
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -1,7 +1,9 @@
 import os
+import json
 import pickle
 import base64
 import re
+import redis
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
@@ -9,8 +11,11 @@ from google.auth.transport.requests import Request
 from dotenv import load_dotenv
 from notion_client import Client
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
 from google.oauth2.service_account import Credentials
+from google.oauth2.credentials import Credentials as UserCredentials
 
 load_dotenv()
 
@@ -35,14 +40,60 @@ if not all([
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly', 'https://www.googleapis.com/auth/spreadsheets']
 
-notion = Client(auth=notion_api_key)
+# Patterns applied to every fetched message
+SUBJECT_PATTERN = re.compile(r'^Watch "(.+)" on YouTube$')
+URL_PATTERN = re.compile(r'(https?://\S+)')
 
+# Pages created at once; this bounds concurrency, not the request rate, so bursts can still draw 429s
+NOTION_MAX_WORKERS = 3
+
+# Notion client, built on first use
+@lru_cache(maxsize=1)
+def get_notion_client():
+    return Client(auth=notion_api_key)
+
+# Redis configuration
+redis_host = os.getenv('REDIS_HOST', 'localhost')
+redis_port = int(os.getenv('REDIS_PORT', 6379))
+redis_password = os.getenv('REDIS_PASSWORD', None)
+
+# Connect to Redis
+r = redis.Redis(host=redis_host, port=redis_port, password=redis_password, decode_responses=True)
+
+# Cached set of URLs already saved to the Knowledge Hub
+KNOWLEDGE_HUB_URLS_KEY = "knowledge_hub:urls"
+KNOWLEDGE_HUB_URLS_TTL = 24 * 60 * 60
+
+# Add a URL to the cached set only while it exists, so a missing set still triggers a full rescan
+add_cached_url = r.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('SADD', KEYS[1], ARGV[1])
+end
+return 0
+""")
+
+# Gmail OAuth token, stored as the JSON produced by Credentials.to_json()
+GMAIL_TOKEN_KEY = "gmail_token_json"
+
+# Token file written by earlier versions; read once to migrate it into Redis, never written
+LEGACY_TOKEN_PATH = 'token.pickle'
+
+@lru_cache(maxsize=1)
 def get_gmail_service():
+    """Build the Gmail service once per process.
+
+    Call `get_gmail_service.cache_clear()` after an authentication error to force a token reload.
+    """
     creds = None
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
+    token_json = r.get(GMAIL_TOKEN_KEY)
+    if token_json:
+        creds = UserCredentials.from_authorized_user_info(json.loads(token_json), SCOPES)
+    elif os.path.exists(LEGACY_TOKEN_PATH):
+        print("Migrating token.pickle to Redis...")
+        with open(LEGACY_TOKEN_PATH, 'rb') as token:
             creds = pickle.load(token)
-    
+        r.set(GMAIL_TOKEN_KEY, creds.to_json())
+
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             print("Refreshing access token...")
@@ -51,13 +102,13 @@ def get_gmail_service():
             print("Initiating OAuth2 authorization flow...")
             flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
             creds = flow.run_local_server(port=0)
-        
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
+
+        r.set(GMAIL_TOKEN_KEY, creds.to_json())
 
     print("Credentials obtained successfully.")
     return build('gmail', 'v1', credentials=creds)
 
+@lru_cache(maxsize=1)
 def get_sheets_service():
     creds = Credentials.from_service_account_file(GDRIVE_CREDENTIALS_PATH, scopes=SCOPES)
     return build('sheets', 'v4', credentials=creds)
@@ -67,34 +118,65 @@ def print_google_sheet_link():
     print(f"Google Sheet link for checking logs: {sheet_url}")
 
 def clean_subject(subject):
-    return re.sub(r'^Watch "(.+)" on YouTube$', r'\1', subject)
+    return SUBJECT_PATTERN.sub(r'\1', subject)
 
 def extract_url(snippet):
-    url_match = re.search(r'(https?://\S+)', snippet)
+    url_match = URL_PATTERN.search(snippet)
     return url_match.group(1) if url_match else None
 
-def check_existing_entry(url):
-    results = notion.databases.query(
-        database_id=notion_knowledge_hub_db,
-        filter={
-            "property": "URL",
-            "url": {
-                "equals": url
-            }
-        }
-    ).get("results")
-    return len(results) > 0
+def warm_url_cache():
+    """Populate the Redis URL set with a full scan of the Knowledge Hub if it is missing or expired."""
+    if r.exists(KNOWLEDGE_HUB_URLS_KEY):
+        return
+
+    print("Knowledge Hub URL cache is empty. Scanning Notion database...")
+    urls = set()
+    query = {
+        "database_id": notion_knowledge_hub_db,
+        "filter": {"property": "URL", "url": {"is_not_empty": True}},
+        "page_size": 100
+    }
+    while True:
+        response = get_notion_client().databases.query(**query)
+        urls.update(page['properties']['URL']['url'] for page in response.get("results", []))
+        if not response.get("has_more"):
+            break
+        query["start_cursor"] = response["next_cursor"]
+
+    if urls:
+        pipe = r.pipeline()
+        pipe.sadd(KNOWLEDGE_HUB_URLS_KEY, *urls)
+        pipe.expire(KNOWLEDGE_HUB_URLS_KEY, KNOWLEDGE_HUB_URLS_TTL)
+        pipe.execute()
+    print(f"Cached {len(urls)} Knowledge Hub URLs in Redis.")
+
+def fetch_existing_urls(urls):
+    """Return the subset of `urls` already present in the cached Knowledge Hub URL set."""
+    if not urls:
+        return set()
+    flags = r.smismember(KNOWLEDGE_HUB_URLS_KEY, urls)
+    return {url for url, exists in zip(urls, flags) if exists}
 
 def add_to_notion(title, url):
-    notion.pages.create(
+    get_notion_client().pages.create(
         parent={"database_id": notion_knowledge_hub_db},
         properties={
             "Name": {"title": [{"text": {"content": title}}]},
             "URL": {"url": url}
         }
     )
+    add_cached_url(keys=[KNOWLEDGE_HUB_URLS_KEY], args=[url])
     print(f"Added to Notion: {title}")
 
+def save_share(share):
+    """Add a share to Notion, returning whether it was saved so one failure does not stop the others."""
+    try:
+        add_to_notion(share['title'], share['url'])
+        return True
+    except Exception as e:
+        print(f"Failed to add to Notion: {share['title']} ({e})")
+        return False
+
 def get_last_checked_timestamp():
     service = get_sheets_service()
     result = service.spreadsheets().values().get(
@@ -107,26 +189,34 @@ def get_last_checked_timestamp():
     last_timestamp = values[-1][0]
     return datetime.strptime(last_timestamp, '%m/%d/%Y %H:%M:%S').replace(tzinfo=timezone.utc)
 
-def update_checked_timestamp():
+# Append queued log rows to the sheet in a single write request
+def flush_timestamps(rows):
+    if not rows:
+        return
     service = get_sheets_service()
-    now = datetime.now(timezone.utc).strftime('%m/%d/%Y %H:%M:%S')
     service.spreadsheets().values().append(
         spreadsheetId=GOOGLE_SPREADSHEET_ID,
         range='gmail-checker-logs!A:A',
         valueInputOption='USER_ENTERED',
         insertDataOption='INSERT_ROWS',
-        body={'values': [[now]]}
+        body={'values': rows}
     ).execute()
+
+def update_checked_timestamp():
+    now = datetime.now(timezone.utc).strftime('%m/%d/%Y %H:%M:%S')
+    flush_timestamps([[now]])
     print(f"Timestamp updated: {now}")
 
 def search_messages(service, user_id='me', last_checked_at=None):
     try:
         query = f"from:{youtube_saves_email_address} subject:Watch"
         if last_checked_at:
-            query += f" after:{last_checked_at.strftime('%Y/%m/%d')}"
+            # Epoch seconds give Gmail second-level precision instead of whole days
+            query += f" after:{int(last_checked_at.timestamp())}"
 
         print(f"Using Gmail query: {query}")
 
+        candidates = []
         youtube_shares = []
         results = service.users().messages().list(
             userId=user_id, 
@@ -140,21 +230,42 @@ def search_messages(service, user_id='me', last_checked_at=None):
 
         print(f"Found {len(messages)} messages matching the query.")
 
+        fetched = {}
+
+        def collect_message(request_id, response, exception):
+            if exception is not None:
+                print(f"Failed to fetch message {request_id}: {exception}")
+                return
+            fetched[request_id] = response
+
+        # Gmail allows at most 100 calls per batch request
+        for i in range(0, len(messages), 100):
+            batch = service.new_batch_http_request(callback=collect_message)
+            for message in messages[i:i + 100]:
+                batch.add(
+                    service.users().messages().get(
+                        userId=user_id,
+                        id=message['id'],
+                        format='metadata',
+                        metadataHeaders=['Subject']
+                    ),
+                    request_id=message['id']
+                )
+            batch.execute()
+
         for message in messages:
-            msg = service.users().messages().get(userId=user_id, id=message['id']).execute()
+            msg = fetched.get(message['id'])
+            if msg is None:
+                continue
 
             msg_date = datetime.fromtimestamp(int(msg['internalDate'])/1000, tz=timezone.utc)
 
             print(f"Processing message from {msg_date}")
 
-            if last_checked_at and msg_date <= last_checked_at:
-                print(f"Skipping message: not newer than last checked timestamp ({last_checked_at})")
-                continue
-
             payload = msg['payload']
-            headers = payload['headers']
+            headers = {header['name']: header['value'] for header in payload['headers']}
 
-            subject = next(header['value'] for header in headers if header['name'] == 'Subject')
+            subject = headers.get('Subject', '')
             clean_title = clean_subject(subject)
 
             url = extract_url(msg['snippet'])
@@ -163,12 +274,19 @@ def search_messages(service, user_id='me', last_checked_at=None):
                 print(f"Skipping message: no URL found in snippet")
                 continue
 
-            if check_existing_entry(url):
+            candidates.append({'title': clean_title, 'url': url})
+
+        existing_urls = fetch_existing_urls(list({share['url'] for share in candidates}))
+
+        for share in candidates:
+            if share['url'] in existing_urls:
                 print(f"Skipping message: URL already exists in Notion")
                 continue
 
-            youtube_shares.append({'title': clean_title, 'url': url})
-            print(f"Added to processing list: {clean_title}")
+            # The same video shared twice in one run should only be saved once
+            existing_urls.add(share['url'])
+            youtube_shares.append(share)
+            print(f"Added to processing list: {share['title']}")
 
         print(f"Total emails processed: {len(messages)}")
         print(f"New YouTube shares found: {len(youtube_shares)}")
@@ -180,10 +298,16 @@ def search_messages(service, user_id='me', last_checked_at=None):
 
 def main():
     try:
-        print("Initializing Gmail service...")
-        service = get_gmail_service()
-
-        last_checked_at = get_last_checked_timestamp()
+        # Gmail, Notion and Sheets setup are independent, so run them side by side
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            print("Initializing Gmail service...")
+            service_future = executor.submit(get_gmail_service)
+            cache_future = executor.submit(warm_url_cache)
+            last_checked_future = executor.submit(get_last_checked_timestamp)
+
+        service = service_future.result()
+        cache_future.result()
+        last_checked_at = last_checked_future.result()
         if last_checked_at:
             print(f"Searching for YouTube share emails since {last_checked_at}...")
         else:
@@ -193,8 +317,13 @@ def main():
 
         if youtube_shares:
             print(f"Found {len(youtube_shares)} new YouTube share emails:")
-            for share in youtube_shares:
-                add_to_notion(share['title'], share['url'])
+            # Each page create is an independent request, so overlap them within Notion's rate limit
+            with ThreadPoolExecutor(max_workers=NOTION_MAX_WORKERS) as executor:
+                saved = list(executor.map(save_share, youtube_shares))
+            # Keep the checkpoint so the next run retries failed shares; saved ones are skipped via the URL cache
+            if not all(saved):
+                print(f"{saved.count(False)} shares failed to save. Timestamp not updated.")
+                return
         else:
             print('No new YouTube share emails found.')
 
@@ -1,8 +1,12 @@
 import os
-import json
-import requests
+import orjson
+import time
+import shelve
+import asyncio
+import httpx
 from dotenv import load_dotenv
 from pathlib import Path
+from functools import partial
 from notion_client import Client
 
 # Define the path to the .env file relative to the script's location
@@ -24,46 +28,73 @@ if not notion_knowledge_hub_db:
 # Initialize Notion client
 notion = Client(auth=notion_api_key)
 
-# Function to fetch blocks and parse content recursively
-def fetch_and_parse_blocks(block_id, headers):
-    blocks_url = f"https://api.notion.com/v1/blocks/{block_id}/children"
-    response = requests.get(blocks_url, headers=headers)
+# On-disk cache of block children, keyed by block ID and the page's last edit time
+BLOCK_CACHE_PATH = '.notion_block_cache'
+BLOCK_CACHE_TTL = 24 * 60 * 60
+# Each entry's write time lives under its own small key so eviction never unpickles block data
+BLOCK_CACHE_TS_PREFIX = 'ts:'
+
+# Retry policy for block fetches; the semaphore caps requests in flight and the retries absorb 429s
+NOTION_MAX_RETRIES = 5
+NOTION_RETRY_BACKOFF = 0.5
+NOTION_RETRY_STATUSES = {429, 500, 502, 503, 504}
+notion_semaphore = asyncio.Semaphore(3)
+
+# Call a Notion endpoint, retrying transient failures with exponential backoff
+async def notion_request(client, method, url, **kwargs):
+    for attempt in range(NOTION_MAX_RETRIES + 1):
+        async with notion_semaphore:
+            response = await client.request(method, url, **kwargs)
+        if response.status_code not in NOTION_RETRY_STATUSES or attempt == NOTION_MAX_RETRIES:
+            break
+        # Prefer the wait Notion asks for on 429s over our own backoff
+        retry_after = response.headers.get("Retry-After")
+        await asyncio.sleep(float(retry_after) if retry_after else NOTION_RETRY_BACKOFF * (2 ** attempt))
     response.raise_for_status()
-    data_blocks = response.json()
+    return response
+
+# Fetch a block's children, reusing the cached copy while the page is unchanged
+async def fetch_block_children(block_id, client, cache, page_edited_at):
+    key = f"{block_id}:{page_edited_at}"
+    cached_at = cache.get(BLOCK_CACHE_TS_PREFIX + key)
+    if cached_at is not None and time.time() - cached_at < BLOCK_CACHE_TTL:
+        return cache[key]
+
+    blocks_url = f"https://api.notion.com/v1/blocks/{block_id}/children"
+    response = await notion_request(client, "GET", blocks_url)
+    data_blocks = orjson.loads(response.content)
+    cache[key] = data_blocks
+    cache[BLOCK_CACHE_TS_PREFIX + key] = time.time()
+    return data_blocks
 
-    markdown_content = ""
+# Function to fetch blocks and parse content recursively
+async def fetch_and_parse_blocks(block_id, client, cache, page_edited_at):
+    data_blocks = await fetch_block_children(block_id, client, cache, page_edited_at)
+
+    # Fetch every nested subtree on this level concurrently
+    nested = [block for block in data_blocks["results"] if block.get("has_children")]
+    rendered = await asyncio.gather(
+        *[fetch_and_parse_blocks(block["id"], client, cache, page_edited_at) for block in nested]
+    )
+    children = {block["id"]: content for block, content in zip(nested, rendered)}
+
+    parts = []
     for block in data_blocks["results"]:
         block_type = block["type"]
 
         # Parse block based on its type
-        if block_type == "paragraph":
-            markdown_content += parse_paragraph(block)
-        elif block_type.startswith("heading_"):
-            markdown_content += parse_heading(block, block_type)
-        elif block_type == "bulleted_list_item":
-            markdown_content += parse_list_item(block, "- ", 0)
-        elif block_type == "numbered_list_item":
-            markdown_content += parse_list_item(block, "1. ", 0)
-        elif block_type == "to_do":
-            markdown_content += parse_to_do(block)
-        elif block_type == "quote":
-            markdown_content += parse_quote(block)
-        elif block_type == "code":
-            markdown_content += parse_code(block)
-        elif block_type == "divider":
-            markdown_content += "---\n"
-        elif block_type == "image":
-            markdown_content += parse_image(block)
-        elif block_type == "callout":
-            markdown_content += parse_callout(block)
+        if block_type.startswith("heading_"):
+            parts.append(parse_heading(block, block_type))
         elif block_type == "toggle":
-            markdown_content += parse_toggle(block)
+            parts.append(parse_toggle(block, children))
+        elif block_type in BLOCK_PARSERS:
+            parts.append(BLOCK_PARSERS[block_type](block))
 
         # Handle nested blocks (children)
         if block.get("has_children"):
-            markdown_content += fetch_and_parse_blocks(block["id"], headers)
+            parts.append(children[block["id"]])
 
-    return markdown_content
+    return "".join(parts)
 
 # Helper functions for each block type
 def parse_paragraph(block):
@@ -104,15 +135,15 @@ def parse_callout(block):
     text = extract_text(block["callout"]["rich_text"])
     return f"> {icon} {text}\n\n"
 
-def parse_toggle(block):
+def parse_toggle(block, children):
     text = extract_text(block["toggle"]["rich_text"])
     toggle_content = f"* {text}\n"
     if block.get("has_children"):
-        toggle_content += fetch_and_parse_blocks(block["id"], headers)
+        toggle_content += children[block["id"]]
     return toggle_content
 
 def extract_text(rich_text_array):
-    text = ""
+    parts = []
     for rich_text in rich_text_array:
         if 'text' in rich_text:
             plain_text = rich_text["text"]["content"]
@@ -130,8 +161,21 @@ def extract_text(rich_text_array):
             if rich_text["text"].get("link"):
                 url = rich_text["text"]["link"]["url"]
                 plain_text = f"[{plain_text}]({url})"
-            text += plain_text
-    return text
+            parts.append(plain_text)
+    return "".join(parts)
+
+# Block types rendered from the block alone; headings and toggles are handled in fetch_and_parse_blocks
+BLOCK_PARSERS = {
+    "paragraph": parse_paragraph,
+    "bulleted_list_item": partial(parse_list_item, prefix="- ", indent_level=0),
+    "numbered_list_item": partial(parse_list_item, prefix="1. ", indent_level=0),
+    "to_do": parse_to_do,
+    "quote": parse_quote,
+    "code": parse_code,
+    "divider": lambda block: "---\n",
+    "image": parse_image,
+    "callout": parse_callout,
+}
 
 # Process and collect results
 results = []
@@ -141,7 +185,23 @@ headers = {
     "Content-Type": "application/json"
 }
 
-for page in notion.databases.query(
+# Fetch the content of every page concurrently over one pooled connection set
+async def fetch_page_contents(pages):
+    limits = httpx.Limits(max_connections=20)
+    with shelve.open(BLOCK_CACHE_PATH) as cache:
+        # Drop expired entries, including those left behind by earlier page edits
+        now = time.time()
+        for ts_key in [key for key in cache.keys() if key.startswith(BLOCK_CACHE_TS_PREFIX)]:
+            if now - cache[ts_key] >= BLOCK_CACHE_TTL:
+                del cache[ts_key]
+                cache.pop(ts_key[len(BLOCK_CACHE_TS_PREFIX):], None)
+
+        async with httpx.AsyncClient(headers=headers, limits=limits, timeout=30) as client:
+            return await asyncio.gather(
+                *[fetch_and_parse_blocks(page['id'], client, cache, page['last_edited_time']) for page in pages]
+            )
+
+pages = notion.databases.query(
     **{
         "database_id": notion_knowledge_hub_db,
         "sorts": [
@@ -152,10 +212,12 @@ for page in notion.databases.query(
         ],
         "page_size": 1
     }
-)["results"]:
+)["results"]
+contents = asyncio.run(fetch_page_contents(pages))
+
+for page, content in zip(pages, contents):
     title = page['properties']['Name']['title'][0]['plain_text']
     url = page['properties']['URL']['url'] if 'URL' in page['properties'] else None
-    content = fetch_and_parse_blocks(page['id'], headers)
     
     results.append({
         "title": title,
@@ -164,5 +226,5 @@ for page in notion.databases.query(
     })
 
 # Return the results as JSON
-json_output = json.dumps(results, indent=4)
+json_output = orjson.dumps(results, option=orjson.OPT_INDENT_2).decode()
 print(json_output)
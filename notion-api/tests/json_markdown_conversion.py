@@ -1,7 +1,8 @@
-import json
+import orjson
 import os
 import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -28,42 +29,46 @@ destination_path.mkdir(parents=True, exist_ok=True)  # Recreate the directory
 
 # Function to get the latest JSON file based on timestamp within the database name subfolder
 def get_latest_json_file():
-    json_files = [f for f in os.listdir(base_path) if f.startswith('extracted_content_') and f.endswith('.json')]
-    if not json_files:
+    # File names embed a sortable YYYYMMDD_HHMMSS timestamp, so the largest name is the newest
+    with os.scandir(base_path) as entries:
+        latest = max(
+            (entry.name for entry in entries
+             if entry.is_file() and entry.name.startswith('extracted_content_') and entry.name.endswith('.json')),
+            default=None
+        )
+    if latest is None:
         raise FileNotFoundError(f"No extracted content JSON files found in {base_path}.")
-    json_files.sort(reverse=True)
-    return base_path / json_files[0]
+    return base_path / latest
 
 # Load JSON data from the latest file within the specified database name subfolder
 json_file_path = get_latest_json_file()
-with open(json_file_path, 'r') as f:
-    data = json.load(f)
+data = orjson.loads(json_file_path.read_bytes())
+
+# Characters that are not allowed in file names
+INVALID_FILENAME_CHARS = re.compile(r'[\/:*?"<>|]')
 
 # Function to sanitize the title for use as a filename
 def sanitize_filename(title):
-    return re.sub(r'[\/:*?"<>|]', '_', title)
+    return INVALID_FILENAME_CHARS.sub('_', title)
+
+# Function to create a single Markdown file from a JSON entry
+def create_markdown_file(filename, entry):
+    title = entry['title']
+    url = entry['url']
+    content = entry.get('content', '')
+    full_path = destination_path / filename
+
+    # Save the Markdown content to a file
+    full_path.write_text(f"# {title}\n\nSource: {url}\n\n{content}\n")
+
+    print(f"Markdown file created: {full_path}")
 
-# Function to create a Markdown file from JSON data
+# Function to create Markdown files from JSON data, writing them concurrently
 def create_markdown_files(data):
-    for entry in data:
-        title = entry['title']
-        url = entry['url']
-        content = entry.get('content', '')
-
-        # Generate a sanitized filename
-        filename = sanitize_filename(title) + '.md'
-        full_path = destination_path / filename
-
-        # Prepare the Markdown content
-        markdown_content = f"# {title}\n\n"
-        markdown_content += f"Source: {url}\n\n"
-        markdown_content += f"{content}\n"
-
-        # Save the Markdown content to a file
-        with open(full_path, 'w') as md_file:
-            md_file.write(markdown_content)
-        
-        print(f"Markdown file created: {full_path}")
+    # Generate sanitized filenames up front; as before, a later entry with the same filename wins
+    entries = {sanitize_filename(entry['title']) + '.md': entry for entry in data}
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(create_markdown_file, entries.keys(), entries.values()))
 
 # Create Markdown files from the JSON data
 create_markdown_files(data)
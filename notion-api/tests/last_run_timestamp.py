@@ -17,23 +17,26 @@ CREDENTIALS_PATH = os.getenv('GDRIVE_CREDENTIALS_PATH')
 SPREADSHEET_ID = '1ky3HHYF_gpOFZHE3J9pGt-6J8cIyXoKmW80ZpeZR-_c'
 SHEET_NAME = 'notion-export-logs'
 
-def append_timestamp_to_sheet():
+def flush_timestamps(rows):
     # Load credentials and create a service instance
     creds = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=SCOPES)
     service = build('sheets', 'v4', credentials=creds)
 
-    # Get the current timestamp
-    now = datetime.datetime.now().isoformat()
-
-    # Append the timestamp to the sheet
+    # Append every queued row to the sheet in one request
     request = service.spreadsheets().values().append(
         spreadsheetId=SPREADSHEET_ID,
         range=f'{SHEET_NAME}!A:A',
         valueInputOption='USER_ENTERED',
         insertDataOption='INSERT_ROWS',
-        body={'values': [[now]]}
+        body={'values': rows}
     )
-    response = request.execute()
+    return request.execute()
+
+def append_timestamp_to_sheet():
+    # Get the current timestamp
+    now = datetime.datetime.now().isoformat()
+
+    response = flush_timestamps([[now]])
     print('Timestamp added:', response)
 
 if __name__ == '__main__':
@@ -1,9 +1,14 @@
 import os
-import json
-import requests
+import orjson
+import time
+import shelve
+import asyncio
+import httpx
 from dotenv import load_dotenv
 from pathlib import Path
+from functools import partial
 from notion_client import Client
+from notion_client.helpers import iterate_paginated_api
 from datetime import datetime, timezone, timedelta
 
 # Define the path to the .env file relative to the script's location
@@ -37,46 +42,95 @@ database_name = notion.databases.retrieve(notion_knowledge_hub_db)['title'][0]['
 destination_path = Path('database-extractions') / database_name
 destination_path.mkdir(parents=True, exist_ok=True)
 
-# Function to fetch blocks and parse content recursively
-def fetch_and_parse_blocks(block_id, headers):
-    blocks_url = f"https://api.notion.com/v1/blocks/{block_id}/children"
-    response = requests.get(blocks_url, headers=headers)
+# Find the newest extraction; file names embed a sortable YYYYMMDD_HHMMSS timestamp
+def get_latest_json_file():
+    with os.scandir(destination_path) as entries:
+        latest = max(
+            (entry.name for entry in entries
+             if entry.is_file() and entry.name.startswith('extracted_content_') and entry.name.endswith('.json')),
+            default=None
+        )
+    return destination_path / latest if latest else None
+
+# Sidecar recording when the last successful extraction started; delete it to force a full extraction.
+# Each extraction is a complete snapshot: incremental runs merge edited pages into the previous one,
+# so without a previous snapshot the sidecar is ignored and every page is extracted.
+last_extract_path = destination_path / '.last_extract.json'
+previous_json_path = get_latest_json_file()
+last_extract_at = None
+previous_results = []
+if previous_json_path and last_extract_path.exists():
+    last_extract_at = orjson.loads(last_extract_path.read_bytes())['last_run_ts']
+    previous_results = orjson.loads(previous_json_path.read_bytes())
+
+# On-disk cache of block children, keyed by block ID and the page's last edit time.
+# Only edited pages are queried after the first run, so hits mostly come from re-running a full extraction.
+BLOCK_CACHE_PATH = '.notion_block_cache'
+BLOCK_CACHE_TTL = 24 * 60 * 60
+# Each entry's write time lives under its own small key so eviction never unpickles block data
+BLOCK_CACHE_TS_PREFIX = 'ts:'
+
+# Retry policy for block fetches; the semaphore caps requests in flight and the retries absorb 429s
+NOTION_MAX_RETRIES = 5
+NOTION_RETRY_BACKOFF = 0.5
+NOTION_RETRY_STATUSES = {429, 500, 502, 503, 504}
+notion_semaphore = asyncio.Semaphore(3)
+
+# Call a Notion endpoint, retrying transient failures with exponential backoff
+async def notion_request(client, method, url, **kwargs):
+    for attempt in range(NOTION_MAX_RETRIES + 1):
+        async with notion_semaphore:
+            response = await client.request(method, url, **kwargs)
+        if response.status_code not in NOTION_RETRY_STATUSES or attempt == NOTION_MAX_RETRIES:
+            break
+        # Prefer the wait Notion asks for on 429s over our own backoff
+        retry_after = response.headers.get("Retry-After")
+        await asyncio.sleep(float(retry_after) if retry_after else NOTION_RETRY_BACKOFF * (2 ** attempt))
     response.raise_for_status()
-    data_blocks = response.json()
+    return response
+
+# Fetch a block's children, reusing the cached copy while the page is unchanged
+async def fetch_block_children(block_id, client, cache, page_edited_at):
+    key = f"{block_id}:{page_edited_at}"
+    cached_at = cache.get(BLOCK_CACHE_TS_PREFIX + key)
+    if cached_at is not None and time.time() - cached_at < BLOCK_CACHE_TTL:
+        return cache[key]
 
-    markdown_content = ""
+    blocks_url = f"https://api.notion.com/v1/blocks/{block_id}/children"
+    response = await notion_request(client, "GET", blocks_url)
+    data_blocks = orjson.loads(response.content)
+    cache[key] = data_blocks
+    cache[BLOCK_CACHE_TS_PREFIX + key] = time.time()
+    return data_blocks
+
+# Function to fetch blocks and parse content recursively
+async def fetch_and_parse_blocks(block_id, client, cache, page_edited_at):
+    data_blocks = await fetch_block_children(block_id, client, cache, page_edited_at)
+
+    # Fetch every nested subtree on this level concurrently
+    nested = [block for block in data_blocks["results"] if block.get("has_children")]
+    rendered = await asyncio.gather(
+        *[fetch_and_parse_blocks(block["id"], client, cache, page_edited_at) for block in nested]
+    )
+    children = {block["id"]: content for block, content in zip(nested, rendered)}
+
+    parts = []
     for block in data_blocks["results"]:
         block_type = block["type"]
 
         # Parse block based on its type
-        if block_type == "paragraph":
-            markdown_content += parse_paragraph(block)
-        elif block_type.startswith("heading_"):
-            markdown_content += parse_heading(block, block_type)
-        elif block_type == "bulleted_list_item":
-            markdown_content += parse_list_item(block, "- ", 0)
-        elif block_type == "numbered_list_item":
-            markdown_content += parse_list_item(block, "1. ", 0)
-        elif block_type == "to_do":
-            markdown_content += parse_to_do(block)
-        elif block_type == "quote":
-            markdown_content += parse_quote(block)
-        elif block_type == "code":
-            markdown_content += parse_code(block)
-        elif block_type == "divider":
-            markdown_content += "---\n"
-        elif block_type == "image":
-            markdown_content += parse_image(block)
-        elif block_type == "callout":
-            markdown_content += parse_callout(block)
+        if block_type.startswith("heading_"):
+            parts.append(parse_heading(block, block_type))
         elif block_type == "toggle":
-            markdown_content += parse_toggle(block)
+            parts.append(parse_toggle(block, children))
+        elif block_type in BLOCK_PARSERS:
+            parts.append(BLOCK_PARSERS[block_type](block))
 
         # Handle nested blocks (children)
         if block.get("has_children"):
-            markdown_content += fetch_and_parse_blocks(block["id"], headers)
+            parts.append(children[block["id"]])
 
-    return markdown_content
+    return "".join(parts)
 
 # Helper functions for each block type
 def parse_paragraph(block):
@@ -117,15 +171,15 @@ def parse_callout(block):
     text = extract_text(block["callout"]["rich_text"])
     return f"> {icon} {text}\n\n"
 
-def parse_toggle(block):
+def parse_toggle(block, children):
     text = extract_text(block["toggle"]["rich_text"])
     toggle_content = f"* {text}\n"
     if block.get("has_children"):
-        toggle_content += fetch_and_parse_blocks(block["id"], headers)
+        toggle_content += children[block["id"]]
     return toggle_content
 
 def extract_text(rich_text_array):
-    text = ""
+    parts = []
     for rich_text in rich_text_array:
         if 'text' in rich_text:
             plain_text = rich_text["text"]["content"]
@@ -143,8 +197,21 @@ def extract_text(rich_text_array):
             if rich_text["text"].get("link"):
                 url = rich_text["text"]["link"]["url"]
                 plain_text = f"[{plain_text}]({url})"
-            text += plain_text
-    return text
+            parts.append(plain_text)
+    return "".join(parts)
+
+# Block types rendered from the block alone; headings and toggles are handled in fetch_and_parse_blocks
+BLOCK_PARSERS = {
+    "paragraph": parse_paragraph,
+    "bulleted_list_item": partial(parse_list_item, prefix="- ", indent_level=0),
+    "numbered_list_item": partial(parse_list_item, prefix="1. ", indent_level=0),
+    "to_do": parse_to_do,
+    "quote": parse_quote,
+    "code": parse_code,
+    "divider": lambda block: "---\n",
+    "image": parse_image,
+    "callout": parse_callout,
+}
 
 # Process and collect results
 results = []
@@ -154,45 +221,89 @@ headers = {
     "Content-Type": "application/json"
 }
 
+# Fetch the content of every page concurrently over one pooled connection set
+async def fetch_page_contents(pages):
+    limits = httpx.Limits(max_connections=20)
+    with shelve.open(BLOCK_CACHE_PATH) as cache:
+        # Drop expired entries, including those left behind by earlier page edits
+        now = time.time()
+        for ts_key in [key for key in cache.keys() if key.startswith(BLOCK_CACHE_TS_PREFIX)]:
+            if now - cache[ts_key] >= BLOCK_CACHE_TTL:
+                del cache[ts_key]
+                cache.pop(ts_key[len(BLOCK_CACHE_TS_PREFIX):], None)
+
+        async with httpx.AsyncClient(headers=headers, limits=limits, timeout=30) as client:
+            return await asyncio.gather(
+                *[fetch_and_parse_blocks(page['id'], client, cache, page['last_edited_time']) for page in pages]
+            )
+
 # Query the Notion database with a filter based on Created time
-for page in notion.databases.query(
-    **{
-        "database_id": notion_knowledge_hub_db,
-        "filter": {
-            "property": "Created",
-            "date": {
-                "after": target_datetime_utc.isoformat()
-            }
-        },
-        "sorts": [
-            {
-                "property": "Created",
-                "direction": "descending"
-            }
+query_filter = {
+    "property": "Created",
+    "date": {
+        "after": target_datetime_utc.isoformat()
+    }
+}
+
+# Only re-extract pages edited since the last successful extraction
+if last_extract_at:
+    query_filter = {
+        "and": [
+            query_filter,
+            {"timestamp": "last_edited_time", "last_edited_time": {"after": last_extract_at}}
         ]
     }
-)["results"]:
+
+extract_started_at = datetime.now(timezone.utc).isoformat()
+pages = list(iterate_paginated_api(
+    notion.databases.query,
+    database_id=notion_knowledge_hub_db,
+    filter=query_filter,
+    sorts=[
+        {
+            "property": "Created",
+            "direction": "descending"
+        }
+    ]
+))
+contents = asyncio.run(fetch_page_contents(pages))
+
+for page, content in zip(pages, contents):
     title = page['properties']['Name']['title'][0]['plain_text']
     url = page['properties']['URL']['url'] if 'URL' in page['properties'] else None
-    content = fetch_and_parse_blocks(page['id'], headers)
     
     # Get the creation date from Notion
     created_time = datetime.fromisoformat(page['created_time'].rstrip('Z'))
     formatted_date = created_time.strftime("%b %-d, %Y")  # Format: Aug 24, 2024 or Aug 3, 2024
     
     results.append({
+        "id": page['id'],
         "title": title,
         "url": url,
         "content": f"---\nRelated Journal: [[{formatted_date}]]\n---\n\n{content}"
     })
 
-# Generate a filename with a timestamp
-timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-json_filename = f'extracted_content_{timestamp}.json'
+if not pages:
+    print("No pages returned; keeping the existing JSON file.")
+else:
+    # On incremental runs, replace the previous copy of each edited page; entries from before IDs were
+    # recorded match on title. Full runs leave previous_results empty and write exactly the queried pages.
+    edited_ids = {entry['id'] for entry in results}
+    edited_titles = {entry['title'] for entry in results}
+    results.extend(
+        entry for entry in previous_results
+        if entry.get('id') not in edited_ids and ('id' in entry or entry['title'] not in edited_titles)
+    )
+
+    # Generate a filename with a timestamp
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    json_filename = f'extracted_content_{timestamp}.json'
+
+    # Save the results to a JSON file in the destination path
+    json_filepath = destination_path / json_filename
+    json_filepath.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
 
-# Save the results to a JSON file in the destination path
-json_filepath = destination_path / json_filename
-with open(json_filepath, 'w') as json_file:
-    json.dump(results, json_file, indent=4)
+    print(f"JSON file created: {json_filepath}")
 
-print(f"JSON file created: {json_filepath}")
\ No newline at end of file
+# Record the start of this run so edits made while it ran are picked up next time
+last_extract_path.write_bytes(orjson.dumps({'last_run_ts': extract_started_at}))
@@ -1,5 +1,6 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables from .env file, if available
@@ -7,7 +8,8 @@ load_dotenv()
 
 def find_or_create_target_template_directory(base_path):
     """Search for or create a directory within the base path that ends with '_Templates'."""
-    template_dirs = [d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d)) and d.endswith('_Templates')]
+    with os.scandir(base_path) as entries:
+        template_dirs = [entry.name for entry in entries if entry.name.endswith('_Templates') and entry.is_dir()]
     
     if len(template_dirs) == 0:
         # If no _Templates directory exists, create one
@@ -20,29 +22,93 @@ def find_or_create_target_template_directory(base_path):
     
     return os.path.join(base_path, template_dirs[0])
 
+def list_existing_paths(root):
+    """Return the paths under root, relative to it, collected in a single scandir walk."""
+    existing = set()
+    stack = [(root, "")]
+    while stack:
+        current_dir, relative_path = stack.pop()
+        with os.scandir(current_dir) as entries:
+            for entry in entries:
+                entry_path = os.path.join(relative_path, entry.name)
+                existing.add(entry_path)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, entry_path))
+    return existing
+
+def open_without_truncating(path, flags):
+    """Opener for open() that creates the file if needed but leaves existing content in place."""
+    return os.open(path, flags & ~os.O_TRUNC, 0o666)
+
+def copy_file(src_file, dest_file):
+    """Copy a file's data and permission bits, letting the kernel move the data where it can."""
+    if not hasattr(os, "copy_file_range"):
+        # Not Linux; shutil already uses the platform's fast copy (fcopyfile on macOS)
+        shutil.copy(src_file, dest_file)
+        return
+
+    # Open the destination without truncating it so a file copied onto itself can be refused, as shutil does
+    with open(src_file, 'rb', buffering=0) as src, \
+            open(dest_file, 'wb', buffering=0, opener=open_without_truncating) as dest:
+        src_stat = os.fstat(src.fileno())
+        dest_stat = os.fstat(dest.fileno())
+        if (src_stat.st_dev, src_stat.st_ino) == (dest_stat.st_dev, dest_stat.st_ino):
+            raise shutil.SameFileError(f"{src_file!r} and {dest_file!r} are the same file")
+        os.ftruncate(dest.fileno(), 0)
+
+        remaining = src_stat.st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dest.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            pass
+        if remaining > 0:
+            # Older kernels and some filesystems refuse or copy nothing; finish from the current offsets
+            shutil.copyfileobj(src, dest)
+    shutil.copymode(src_file, dest_file)
+
 def sync_directories_and_files(template_dir, target_templates_dir):
     """Synchronize directories and files from the template to the target path."""
     
-    # Traverse the template directory and copy files and folders
-    for root, dirs, files in os.walk(template_dir):
-        relative_path = os.path.relpath(root, template_dir)
+    # List the target tree once up front instead of probing each destination path
+    existing = list_existing_paths(target_templates_dir)
+    copies = []
+
+    # Traverse the template directory with a stack of (source directory, path relative to the template root)
+    stack = [(template_dir, "")]
+    while stack:
+        src_dir, relative_path = stack.pop()
         target_dir = os.path.join(target_templates_dir, relative_path)
         
         # Create directory if it does not exist
-        if not os.path.exists(target_dir):
-            os.makedirs(target_dir)
+        if relative_path and relative_path not in existing:
+            os.makedirs(target_dir, exist_ok=True)
             print(f"Created directory: {target_dir}")
 
-        # Copy or overwrite files
-        for file in files:
-            src_file = os.path.join(root, file)
-            dest_file = os.path.join(target_dir, file)
-            if not os.path.exists(dest_file):
-                shutil.copy2(src_file, dest_file)
-                print(f"Copied file: {src_file} to {dest_file}")
-            else:
-                shutil.copy2(src_file, dest_file)
-                print(f"File already exists and was overwritten: {dest_file}")
+        # Queue files to copy or overwrite, and subdirectories to visit (symlinked directories are not followed, as with os.walk)
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, os.path.join(relative_path, entry.name)))
+                    continue
+                if not entry.is_file():
+                    continue
+                dest_file = os.path.join(target_dir, entry.name)
+                copies.append((entry.path, dest_file, os.path.join(relative_path, entry.name) in existing))
+
+    # Copy files concurrently now that every target directory exists
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        list(executor.map(copy_file, [src for src, _, _ in copies], [dest for _, dest, _ in copies]))
+
+    # Report from the main thread so the output order is deterministic
+    for src_file, dest_file, overwritten in copies:
+        if overwritten:
+            print(f"File already exists and was overwritten: {dest_file}")
+        else:
+            print(f"Copied file: {src_file} to {dest_file}")
 
 def main():
     # Use the environment variable to determine the target base path
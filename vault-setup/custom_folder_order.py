@@ -23,17 +23,18 @@ custom_order = [
 def rename_folders(base_path, order):
     try:
         # Gather all folders in the directory
-        folders = [f for f in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, f))]
+        with os.scandir(base_path) as entries:
+            folders = [entry.name for entry in entries if entry.is_dir()]
         
         # Map to hold the existing folder paths without prefixes
         folder_map = {}
+        order_set = set(order)
         
-        # Populate the folder map
+        # Populate the folder map, stripping the two-digit order prefix before the lookup
         for folder in folders:
-            for name in order:
-                if folder.endswith(name):
-                    folder_map[name] = folder
-                    break
+            suffix = folder[2:] if len(folder) > 2 and folder[:2].isdigit() else folder
+            if suffix in order_set:
+                folder_map[suffix] = folder
         
         # Rename folders based on the custom order
         for index, name in enumerate(order, start=1):